@@ -1,347 +1,480 @@
-import serial # $$$
-import csv
-import json
-import logging
-import signal  # X
-import sys
-import ast  # X
-import threading
-import requests  # $$$$
-import time
-from datetime import datetime
-from sense_hat import SenseHat  # $ 
-import subprocess
-import tempfile
-import os
-
-
-API_KEY = "v2:d2887ab756d415d273b0bb9d6fbc59a79174f4ded13e0e867783142c7b8ae7f2:G2NlbWqa7278lxj2vR-1CxUaOXpWpo8g"
-ONLINE_BACKUP_URL = "https://script.google.com/macros/s/AKfycbwhAE4sosdSrjO39O1vceJkGiWyaiA2FI870SkmxYVBNcIZnghfhySF9-8SroTplERw6w/exec?gid=0"
-headers = {"X-Api-Key": API_KEY}
-LOGS_PATH = "backend_log.log"
-CSV_PATH = "data.csv"
-JSON_PATH = "data_one.json"
-PORT = "/dev/ttyACM0"
-BAUD = 9600
-DECODE = "utf-8"
-FREQUENCY = 5
-DB_NAME = "admin"
-DB_USER = "admin"
-DB_HOST = "localhost"
-DB_PORT = 5432
-DB_PASS = "admin"
-DB_TABLE = "sensor_data"
-
-# Project scope (active sensors): Temperature, Humidity (Arduino over /dev/ttyACM0) + Pressure (Sense HAT)
-# Optional sensors (UV / rainfall / wind) are kept in this file but disabled (commented out) for now.
-
-os.environ['PGPASSWORD'] = DB_PASS
-
-logging.basicConfig(
-    filename = LOGS_PATH,
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] | %(message)s")
-current = 0
-logging.info(f"Starting Backend freq={FREQUENCY}s")
-def signal_int():
-    logging.info("SIGINT  Exiting Backend "); sys.exit(0)
-signal.signal(signal.SIGINT, signal_int)
-def signal_term():
-    logging.info("SIGTERM Exiting Backend "); sys.exit(0)
-signal.signal(signal.SIGTERM, signal_term)
-
-class AllData():
-    def __init__(self):
-        
-        with open(JSON_PATH, 'r') as file:
-            data = json.load(file)
-            logging.info(f"Resuming from time={data.get('time', 'wait... bad json file?')} at {JSON_PATH}")
-            self.time = data.get("time")
-            self.cidx = 0; self.msgs = "BLANK"; self.mdsc = ""
-            self.temp = data.get("temp", 0); self.humi = data.get("humi", 0); self.pres = data.get("pres", 0)
-
-            # --- Optional sensors (disabled for current project scope) ---
-            # self.windspeed = data.get("windspeed", 0)
-            # self.rainfall = data.get("rainfall", 0)
-            # self.winddirection = data.get("winddirection", 0)
-            # self.uvindex = data.get("uvindex", 0)
-
-            self.count_attr = 0
-            # Only expecting temp/humi/pres
-            self.expect_attr = 3
-            # (previously 7 when wind/rain/uv were enabled)
-    def _tojson(self):
-        return {
-            "time": self.time,
-            "cidx": self.cidx,
-            "cattr": self.count_attr,
-            "temp": self.temp,
-            "humi": self.humi,
-            "pres": self.pres,
-            # --- Optional sensors (disabled for current project scope) ---
-            # "windspeed": self.windspeed,
-            # "winddirection": self.winddirection,
-            # "rainfall": self.rainfall,
-            # "uvindex": self.uvindex,
-        }
-    def _todatabase(self):
-        
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
-            writer = csv.writer(f)
-            writer.writerow([self.time, self.cidx, self.count_attr, self.temp, self.humi, self.pres])
-            temp_filename=f.name
-        try:
-            command = ['psql',
-                       '-d', DB_NAME,
-                       '-U', DB_USER,
-                       '-h', DB_HOST,
-                       '-c', f"\\copy {DB_TABLE}(time, cidx, cattr, temp, humi, pres) FROM '{temp_filename}' CSV"
-                    ]
-            # Previous (disabled): windspeed/winddirection/rainfall/uvindex columns were also inserted.
-            resp = subprocess.run(
-                command,
-                capture_output=True,
-                text=True
-            )
-            
-            if resp.returncode == 0:
-                print("db", end=" ")
-            else:
-                print("Postgres Error:", resp.stderr)
-        except Exception as e:
-            print("Error:",e)
-        finally:
-            os.unlink(temp_filename)
-            
-    def _tobackup(self):
-        try:
-            resp = requests.post(ONLINE_BACKUP_URL, json=self.packet, timeout=5)
-            if resp.status_code in (200, 302):
-                print("gs", end=" ")
-                logging.debug("Sent packet {self.cidx} to online backup with respstatus{resp.status_code}")
-            else:
-                logging.warning("Attempted to send packet {self.cidx} to online backup. Failed with resp status code {resp.status_code}")
-        except requests.exceptions.ReadTimeout:
-            logging.warning(f"Read Timed out. Check backup configuration if issue persists.")
-        except requests.exceptions.RequestException as e:
-            logging.error(f"Attempted to send packet {self.cidx} to online backup, Failed. {e}")
-        except:
-            logging.error(f"Failed to send packet {self.cidx} to online backup for unknown reason, failed with respstatus{resp.status_code}")
-            
-
-    @property
-    def packet(self): return self._tojson()
-    def _tocsv(self):
-        with open(CSV_PATH, "a", newline="") as f:
-            writer = csv.DictWriter(f, fieldnames=self._tojson().keys())
-            writer.writerow(self._tojson())
-        print("csv", end=" ")
-    def start(self):
-        self.time = datetime.now().isoformat()
-        self.count_attr = 0; self.cidx += 1
-    def end(self):
-        with open(JSON_PATH, 'w') as f:
-            json.dump(self.packet, f)
-        self._send_data_threaded()
-    def sensor_attr(self, attr:str, value):
-        self.count_attr += 1
-        setattr(self, attr, value)
-    def _send_data_threaded(self):
-        t_csv = threading.Thread(target=self._tocsv)
-        t_backup = threading.Thread(target=self._tobackup)
-        t_database = threading.Thread(target=self._todatabase)
-        # Current scope: only temp/humi/pres are collected; other sensors are disabled elsewhere.
-        threads = [t_database, t_csv, t_backup]
-    
-        for t in threads: t.start()
-        print('tstart2: ', end=" ")
-        for t in threads: t.join()
-        print(':tend2')
-
-alldata = AllData()
-
-def api_get_rainfall():
-    """unit = mm of rain"""
-    url = "https://api-open.data.gov.sg/v2/real-time/api/rainfall"
-    try:
-        response = requests.get(url, headers=headers, timeout=3)
-    except (requests.exceptions.Timeout, requests.exceptions.ReadTimeout):
-        logging.warning("Connection to Rainfall API timed out."); return
-    response = response.json().get("data")
-    data = response.get("readings")[0].get("data")
-    print('rf', end=' ')
-    for i in data:
-        if i["stationId"]=="S109":
-            alldata.sensor_attr("rainfall", i["value"])
-t_rainfall = threading.Thread(target=api_get_rainfall)
-
-def api_get_windspeed():
-    """unit = knots freq=5min"""
-    url = "https://api-open.data.gov.sg/v2/real-time/api/wind-speed"
-    try:
-        response = requests.get(url, headers=headers, timeout=3)
-    except (requests.exceptions.Timeout, requests.exceptions.ReadTimeout):
-        logging.warning("Connection to WindSpeed API timed out."); return
-    response = response.json().get("data")
-    data = response.get("readings")[0].get("data")
-    print('ws', end=' ')
-    for i in data:
-        if i["stationId"]=="S109":
-            alldata.sensor_attr("windspeed", i["value"])
-
-def api_get_winddirection():
-    """unit = degrees, freq=5min"""
-    url = "https://api-open.data.gov.sg/v2/real-time/api/wind-direction"
-    try:
-        response = requests.get(url, headers=headers, timeout=3)
-    except (requests.exceptions.Timeout, requests.exceptions.ReadTimeout):
-        logging.warning("Connection to WindDirection API timed out."); return
-    response = response.json().get("data")
-    data = response.get("readings")[0].get("data")
-    print('wd', end=' ')
-    for i in data:
-        if i["stationId"]=="S109":
-            alldata.sensor_attr("winddirection", i["value"])
-
-def api_get_UV():
-    """Moving Average. Check every 5 min. unit=UVindex"""
-    url = "https://api-open.data.gov.sg/v2/real-time/api/uv"
-    total = 0
-    try:
-        response = requests.get(url, headers=headers, timeout=3)
-    except (requests.exceptions.Timeout, requests.exceptions.ReadTimeout):
-        logging.warning("Connection to UV API timed out."); return
-    response = response.json().get('data')
-    data = response.get('records')[0]
-    time = data["timestamp"]
-    print("uv", end=" ")
-    for i in data["index"]:
-        total += i["value"]
-        if i["hour"]==time:
-            alldata.sensor_attr("uvindex", i["value"])
-            return 
-        else: total += i["value"]
-        print(total/len(data["index"]), end=' ')
-        alldata.sensor_attr("uvindex", total/len(data["index"]))
-
-try:
-    ser = serial.Serial(PORT, BAUD, timeout=1)
-    time.sleep(2)
-except: print(f"{PORT} related error, serial failed to init. Maybe try reconnecting the device?"); exit()
-
-# def get_temp_humi():
-#     ser.write(0x60)
-#     time.sleep(3)
-#     if ser.in_waiting:
-#         data = ser.read(ser.in_waiting).decode('utf-8')
-#         data = json.loads(data)
-#     else:
-#         logging.warning(f"{PORT} packet lost.")
-#         return
-#     print("th", end=" ")
-#     if data.get("msgs", "BLANK") in ("OK   ", "OK"):
-#         alldata.sensor_attr("temp", data.get("temp", alldata.temp))
-#         alldata.sensor_attr("humi", data.get("humi", alldata.humi))
-#     else:
-#         logging.warning(f"{PORT} raised {data.get('msgs', 'BLANK')} '{data.get('mdsc', 'blank?')}'")
-
-def get_temp_humi():
-    try:
-        # Read exactly one line from Arduino
-        raw = ser.readline().decode("utf-8", errors="ignore").strip()
-
-        if not raw:
-            logging.warning("Arduino serial: empty line")
-            return
-
-        # If Arduino prints extra text, try to extract JSON object
-        if raw[0] != "{":
-            import re
-            m = re.search(r"\{.*\}", raw)
-            if not m:
-                logging.warning(f"Arduino serial: non-JSON: {raw!r}")
-                return
-            raw = m.group(0)
-
-        data = json.loads(raw)
-
-        # Accept temp/humi directly (don’t depend on msgs)
-        if "temp" in data:
-            alldata.sensor_attr("temp", float(data["temp"]))
-        if "humi" in data:
-            alldata.sensor_attr("humi", float(data["humi"]))
-
-        print("th", end=" ")
-
-    except json.JSONDecodeError:
-        logging.warning(f"Arduino serial: bad JSON: {raw!r}")
-    except Exception as e:
-        logging.exception(f"get_temp_humi failed: {e}")
-
-
-try:
-    sense = SenseHat()
-except:
-    logging.error("Sensehat failed to init for an unknown reason. Check physical connections and file permissions.")
-
-def get_pressure():  # barometric data
-    try:
-        p = sense.get_pressure()
-        alldata.sensor_attr("pres", p)
-        time.sleep(0.1); print('pr', end=" ")
-    except:
-        logging.warning("Failed to read Sensehat Pressure Sensor for an unknown reason.")
-    
-def get_data_threaded():
-    # --- Optional sensors (disabled for current project scope) ---
-    # t_rainfall = threading.Thread(target=api_get_rainfall)
-    # t_windspeed = threading.Thread(target=api_get_windspeed)
-    # t_winddirection = threading.Thread(target=api_get_winddirection)
-    # t_UV = threading.Thread(target=api_get_UV)
-    t_temp_humi = threading.Thread(target=get_temp_humi)
-    t_pres = threading.Thread(target=get_pressure)
-    
-    threads = [t_temp_humi, t_pres]
-
-    # Previous (disabled):
-    # threads = [t_UV, t_winddirection, t_windspeed, t_rainfall, t_temp_humi, t_pres]
-    
-    for t in threads: t.start()
-    print('tstart: ', end=" ")
-    for t in threads: t.join()
-    print(':tend', end=" ")
-    
-
-
-process_time = time.time()
-
-"""
-while True:
-    alldata.start()
-    get_data_threaded()
-    alldata.end()
-    try:
-        time.sleep(FREQUENCY-time.time()+process_time)
-    except ValueError:
-        logging.error("Main Process exceeded time limit", FREQUENCY, time.time()-process_time)
-    process_time = time.time()
-"""
-
-while True:
-    alldata.start()
-    get_data_threaded()
-    print(f"T={alldata.temp:.2f}C H={alldata.humi:.2f}% P={alldata.pres:.2f}HPa")
-    alldata.end()
-    
-    # sleep so that each loop starts roughly evert FREQUENCY seconds 
-    
-    elapsed = time.time() - process_time
-    sleep_s = FREQUENCY - elapsed
-    
-    if sleep_s > 0:
-        time.sleep(sleep_s)
-    else:
-        logging.warning(
-        f"Main loop overran by {-sleep_s:.2f}s (FREQUENCY={FREQUENCY}s, elapsed={elapsed:.2f}s)")
-        
-    process_time = time.time()
+import array
+import collections
+import fcntl
+import csv
+import io
+import json
+import logging
+import orjson  # $$
+import os
+import queue
+import signal  # X
+import sys
+import threading
+import requests  # $$$$
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+import psycopg2  # $$
+# serial and sense_hat are imported lazily in their init blocks below:
+# both pull heavy transitive deps and slow cold start on the Pi.
+
+
+API_KEY = "v2:d2887ab756d415d273b0bb9d6fbc59a79174f4ded13e0e867783142c7b8ae7f2:G2NlbWqa7278lxj2vR-1CxUaOXpWpo8g"
+ONLINE_BACKUP_URL = "https://script.google.com/macros/s/AKfycbwhAE4sosdSrjO39O1vceJkGiWyaiA2FI870SkmxYVBNcIZnghfhySF9-8SroTplERw6w/exec?gid=0"
+headers = {"X-Api-Key": API_KEY}
+LOGS_PATH = "backend_log.log"
+CSV_PATH = "data.csv"
+JSON_PATH = "data_one.json"
+PORT = "/dev/ttyACM0"
+BAUD = 9600
+DECODE = "utf-8"
+FREQUENCY = 5
+DB_NAME = "admin"
+DB_USER = "admin"
+DB_HOST = "localhost"
+DB_PORT = 5432
+DB_PASS = "admin"
+DB_TABLE = "sensor_data"
+DB_BATCH_SIZE = 12       # rows buffered before a COPY flush (12 x 5s = 1 min)
+DB_FLUSH_INTERVAL = 60   # seconds; flush even if the batch is not full
+BACKUP_BATCH_MAX = 10    # packets coalesced into one Apps-Script POST
+BACKUP_BATCH_WAIT = 0.2  # seconds to wait for more packets before sending
+
+# Project scope (active sensors): Temperature, Humidity (Arduino over /dev/ttyACM0) + Pressure (Sense HAT)
+# Optional sensors (UV / rainfall / wind) are kept in this file but disabled (commented out) for now.
+
+logging.basicConfig(
+    filename = LOGS_PATH,
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] | %(message)s")
+current = 0
+logging.info(f"Starting Backend freq={FREQUENCY}s")
+
+# Persistent worker pools: per-tick Thread() creation cost dominates for these
+# tiny jobs, so the threads are created once and reused every tick.
+IO_POOL = ThreadPoolExecutor(max_workers=3, thread_name_prefix="io")
+SENSOR_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="sensor")
+
+# Shared HTTP session: keep-alive avoids a fresh TCP+TLS handshake on every
+# data.gov.sg / backup call (100-300ms each over Wi-Fi).
+SESSION = requests.Session()
+SESSION.mount("https://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=1))
+# Set by the signal handlers; the main loop wakes immediately from its wait,
+# flushes pending rows and exits cleanly.
+stop_event = threading.Event()
+def signal_int(signum=None, frame=None):
+    logging.info("SIGINT  Exiting Backend "); stop_event.set()
+signal.signal(signal.SIGINT, signal_int)
+def signal_term(signum=None, frame=None):
+    logging.info("SIGTERM Exiting Backend "); stop_event.set()
+signal.signal(signal.SIGTERM, signal_term)
+
+class AllData():
+    # Column order shared by the CSV sink and the COPY statement.
+    _FIELDS = ("time", "cidx", "cattr", "temp", "humi", "pres")
+    # No per-instance __dict__: attribute access is cheaper and the tick
+    # loop allocates nothing. Extend this when re-enabling the optional
+    # wind/rain/uv sensors.
+    __slots__ = (
+        "time", "cidx", "msgs", "mdsc", "temp", "humi", "pres",
+        "count_attr", "expect_attr", "conn",
+        "_lock", "_pending", "_last_flush", "_backup_q",
+        "_csv_f", "_csv_w", "_packet", "_last_json",
+    )
+    def __init__(self):
+        
+        with open(JSON_PATH, 'r') as file:
+            data = json.load(file)
+            logging.info(f"Resuming from time={data.get('time', 'wait... bad json file?')} at {JSON_PATH}")
+            self.time = data.get("time")
+            self.cidx = 0; self.msgs = "BLANK"; self.mdsc = ""
+            self.temp = data.get("temp", 0); self.humi = data.get("humi", 0); self.pres = data.get("pres", 0)
+
+            # --- Optional sensors (disabled for current project scope) ---
+            # self.windspeed = data.get("windspeed", 0)
+            # self.rainfall = data.get("rainfall", 0)
+            # self.winddirection = data.get("winddirection", 0)
+            # self.uvindex = data.get("uvindex", 0)
+
+            self.count_attr = 0
+            # Only expecting temp/humi/pres
+            self.expect_attr = 3
+            # (previously 7 when wind/rain/uv were enabled)
+        self._lock = threading.Lock()
+        # Non-fatal: the collector keeps running on CSV/backup alone and
+        # _flush_db retries the connection while rows stay buffered.
+        try:
+            self.conn = self._connect_db()
+        except Exception as e:
+            self.conn = None
+            logging.error(f"Postgres unavailable at startup ({e}); will retry on flush.")
+        self._pending = collections.deque(maxlen=64)
+        self._last_flush = time.monotonic()
+        self._backup_q = queue.Queue(maxsize=32)
+        threading.Thread(target=self._backup_worker, daemon=True).start()
+        # Keep the CSV handle open for the process lifetime; line-buffered so
+        # each row still hits the file without an open/close per tick.
+        self._csv_f = open(CSV_PATH, "a", newline="", buffering=1)
+        self._csv_w = csv.writer(self._csv_f)
+        # Single packet dict reused every tick; _tojson mutates it in place.
+        self._packet = dict.fromkeys(self._FIELDS)
+        self._tojson()
+        self._last_json = b""
+    def _connect_db(self):
+        conn = psycopg2.connect(dbname=DB_NAME, user=DB_USER, host=DB_HOST, port=DB_PORT, password=DB_PASS)
+        conn.autocommit = True
+        logging.info(f"Connected to Postgres at {DB_HOST}:{DB_PORT}/{DB_NAME}")
+        return conn
+    def _tojson(self):
+        pkt = self._packet
+        pkt["time"] = self.time
+        pkt["cidx"] = self.cidx
+        pkt["cattr"] = self.count_attr
+        pkt["temp"] = self.temp
+        pkt["humi"] = self.humi
+        pkt["pres"] = self.pres
+        # --- Optional sensors (disabled for current project scope) ---
+        # pkt["windspeed"] = self.windspeed
+        # pkt["winddirection"] = self.winddirection
+        # pkt["rainfall"] = self.rainfall
+        # pkt["uvindex"] = self.uvindex
+        return pkt
+    def _todatabase(self):
+        # Buffer the row; COPY is far cheaper per row than one INSERT round-trip per tick.
+        self._pending.append((self.time, self.cidx, self.count_attr, self.temp, self.humi, self.pres))
+        if len(self._pending) >= DB_BATCH_SIZE or time.monotonic() - self._last_flush > DB_FLUSH_INTERVAL:
+            self._flush_db()
+    def _flush_db(self):
+        if not self._pending:
+            return
+        if self.conn is None:
+            try:
+                self.conn = self._connect_db()
+            except Exception as e:
+                logging.warning(f"Postgres still unavailable ({e}); keeping {len(self._pending)} rows buffered.")
+                return
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        # Previous (disabled): windspeed/winddirection/rainfall/uvindex columns were also inserted.
+        writer.writerows(self._pending)
+        buf.seek(0)
+        try:
+            with self.conn.cursor() as cur:
+                cur.copy_expert(f"COPY {DB_TABLE}(time, cidx, cattr, temp, humi, pres) FROM STDIN CSV", buf)
+            self._pending.clear()
+            self._last_flush = time.monotonic()
+            print("db", end=" ")
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+            # Keep the rows in the deque; they are retried on the next flush.
+            logging.warning(f"Postgres connection lost ({e}), reconnecting.")
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+            self.conn = None
+            try:
+                self.conn = self._connect_db()
+            except Exception as e:
+                print("Postgres Error:", e)
+        except Exception as e:
+            print("Error:",e)
+
+    def _tobackup(self):
+        # Fire-and-forget: enqueue for the backup worker so the main loop
+        # never waits on script.google.com latency. The worker posts later,
+        # so it gets a snapshot of the shared packet, not the live dict.
+        pkt = dict(self._packet)
+        try:
+            self._backup_q.put_nowait(pkt)
+        except queue.Full:
+            # Drop the oldest queued packet; fresh data beats stale on a slow uplink.
+            try:
+                self._backup_q.get_nowait()
+            except queue.Empty:
+                pass
+            self._backup_q.put_nowait(pkt)
+    def _backup_worker(self):
+        # Single daemon consumer; the shared SESSION keeps the TLS connection
+        # alive across ticks instead of handshaking every 5s.
+        while True:
+            # Coalesce up to BACKUP_BATCH_MAX packets into one POST: TLS +
+            # Apps-Script eval cost is per-request, not per-row.
+            batch = [self._backup_q.get()]
+            while len(batch) < BACKUP_BATCH_MAX:
+                try:
+                    batch.append(self._backup_q.get(timeout=BACKUP_BATCH_WAIT))
+                except queue.Empty:
+                    break
+            cidxs = f"{batch[0].get('cidx')}..{batch[-1].get('cidx')}"
+            try:
+                resp = SESSION.post(
+                    ONLINE_BACKUP_URL,
+                    data=orjson.dumps({"rows": batch}),
+                    headers={"Content-Type": "application/json"},
+                    timeout=5)
+                if resp.status_code in (200, 302):
+                    print("gs", end=" ")
+                    logging.debug(f"Sent packets {cidxs} to online backup with respstatus{resp.status_code}")
+                else:
+                    logging.warning(f"Attempted to send packets {cidxs} to online backup. Failed with resp status code {resp.status_code}")
+            except requests.exceptions.ReadTimeout:
+                logging.warning(f"Read Timed out. Check backup configuration if issue persists.")
+            except requests.exceptions.RequestException as e:
+                logging.error(f"Attempted to send packets {cidxs} to online backup, Failed. {e}")
+            except Exception as e:
+                logging.error(f"Failed to send packets {cidxs} to online backup for unknown reason. {e}")
+
+
+    @property
+    def packet(self): return self._tojson()
+    def _tocsv(self):
+        self._csv_w.writerow((self.time, self.cidx, self.count_attr, self.temp, self.humi, self.pres))
+        print("csv", end=" ")
+    def start(self):
+        self.time = datetime.now().isoformat()
+        self.count_attr = 0; self.cidx += 1
+    def end(self):
+        # Refresh the shared packet once per tick; the JSON snapshot and the
+        # backup sink both read from it.
+        self._tojson()
+        buf = orjson.dumps(self._packet)
+        # Skip identical snapshots and swap in the new file atomically —
+        # rewriting every 5s is ~17k small writes/day on the SD card.
+        if buf != self._last_json:
+            with open(JSON_PATH + ".tmp", 'wb') as f:
+                f.write(buf)
+            os.replace(JSON_PATH + ".tmp", JSON_PATH)
+            self._last_json = buf
+        self._send_data_threaded()
+    def sensor_attr(self, attr:str, value):
+        self.count_attr += 1
+        setattr(self, attr, value)
+    def _send_data_threaded(self):
+        # Current scope: only temp/humi/pres are collected; other sensors are disabled elsewhere.
+        futs = [IO_POOL.submit(self._todatabase), IO_POOL.submit(self._tocsv), IO_POOL.submit(self._tobackup)]
+        print('tstart2: ', end=" ")
+        wait(futs)
+        print(':tend2')
+
+alldata = AllData()
+
+def api_get_rainfall():
+    """unit = mm of rain"""
+    url = "https://api-open.data.gov.sg/v2/real-time/api/rainfall"
+    try:
+        response = SESSION.get(url, headers=headers, timeout=3)
+    except (requests.exceptions.Timeout, requests.exceptions.ReadTimeout):
+        logging.warning("Connection to Rainfall API timed out."); return
+    response = response.json().get("data")
+    data = response.get("readings")[0].get("data")
+    print('rf', end=' ')
+    for i in data:
+        if i["stationId"]=="S109":
+            alldata.sensor_attr("rainfall", i["value"])
+t_rainfall = threading.Thread(target=api_get_rainfall)
+
+def api_get_windspeed():
+    """unit = knots freq=5min"""
+    url = "https://api-open.data.gov.sg/v2/real-time/api/wind-speed"
+    try:
+        response = SESSION.get(url, headers=headers, timeout=3)
+    except (requests.exceptions.Timeout, requests.exceptions.ReadTimeout):
+        logging.warning("Connection to WindSpeed API timed out."); return
+    response = response.json().get("data")
+    data = response.get("readings")[0].get("data")
+    print('ws', end=' ')
+    for i in data:
+        if i["stationId"]=="S109":
+            alldata.sensor_attr("windspeed", i["value"])
+
+def api_get_winddirection():
+    """unit = degrees, freq=5min"""
+    url = "https://api-open.data.gov.sg/v2/real-time/api/wind-direction"
+    try:
+        response = SESSION.get(url, headers=headers, timeout=3)
+    except (requests.exceptions.Timeout, requests.exceptions.ReadTimeout):
+        logging.warning("Connection to WindDirection API timed out."); return
+    response = response.json().get("data")
+    data = response.get("readings")[0].get("data")
+    print('wd', end=' ')
+    for i in data:
+        if i["stationId"]=="S109":
+            alldata.sensor_attr("winddirection", i["value"])
+
+def api_get_UV():
+    """Moving Average. Check every 5 min. unit=UVindex"""
+    url = "https://api-open.data.gov.sg/v2/real-time/api/uv"
+    total = 0
+    try:
+        response = SESSION.get(url, headers=headers, timeout=3)
+    except (requests.exceptions.Timeout, requests.exceptions.ReadTimeout):
+        logging.warning("Connection to UV API timed out."); return
+    response = response.json().get('data')
+    data = response.get('records')[0]
+    time = data["timestamp"]
+    print("uv", end=" ")
+    for i in data["index"]:
+        total += i["value"]
+        if i["hour"]==time:
+            alldata.sensor_attr("uvindex", i["value"])
+            return 
+        else: total += i["value"]
+        print(total/len(data["index"]), end=' ')
+        alldata.sensor_attr("uvindex", total/len(data["index"]))
+
+TIOCGSERIAL = 0x541E
+TIOCSSERIAL = 0x541F
+ASYNC_LOW_LATENCY = 0x2000
+
+try:
+    import serial # $$$
+    # timeout=0.1 so readline() stalls at most 100ms on a missing newline
+    ser = serial.Serial(PORT, BAUD, timeout=0.1)
+    try:
+        # Clear the USB-serial driver's default 16ms latency timer so Arduino
+        # frames are delivered as soon as they arrive instead of coalesced.
+        buf = array.array('i', [0] * 32)
+        fcntl.ioctl(ser.fd, TIOCGSERIAL, buf, True)
+        buf[4] |= ASYNC_LOW_LATENCY
+        fcntl.ioctl(ser.fd, TIOCSSERIAL, buf)
+    except OSError:
+        logging.warning(f"{PORT} driver does not support ASYNC_LOW_LATENCY, keeping default latency timer.")
+    time.sleep(2)
+except: print(f"{PORT} related error, serial failed to init. Maybe try reconnecting the device?"); exit()
+
+# def get_temp_humi():
+#     ser.write(0x60)
+#     time.sleep(3)
+#     if ser.in_waiting:
+#         data = ser.read(ser.in_waiting).decode('utf-8')
+#         data = json.loads(data)
+#     else:
+#         logging.warning(f"{PORT} packet lost.")
+#         return
+#     print("th", end=" ")
+#     if data.get("msgs", "BLANK") in ("OK   ", "OK"):
+#         alldata.sensor_attr("temp", data.get("temp", alldata.temp))
+#         alldata.sensor_attr("humi", data.get("humi", alldata.humi))
+#     else:
+#         logging.warning(f"{PORT} raised {data.get('msgs', 'BLANK')} '{data.get('mdsc', 'blank?')}'")
+
+# Which serial attrs got a fresh frame since the last tick; consumed by
+# get_data_threaded so cattr still means "sensor reads this tick".
+_serial_fresh = {"temp": False, "humi": False}
+
+def _serial_producer():
+    # Owns ser exclusively: parses every Arduino frame as it arrives and
+    # publishes the latest temp/humi under the lock, so the 5s tick never
+    # blocks on readline() and no frame is discarded between ticks.
+    while True:
+        try:
+            raw = ser.readline().decode("utf-8", errors="ignore").strip()
+
+            if not raw:
+                continue
+
+            # If Arduino prints extra text, extract the JSON object with
+            # str.find/rfind — same greedy first-{ .. last-} span the old
+            # re.search(r"\{.*\}") matched, without regex cost per line.
+            if raw[0] != "{":
+                i = raw.find("{")
+                j = raw.rfind("}")
+                if i == -1 or j < i:
+                    logging.warning(f"Arduino serial: non-JSON: {raw!r}")
+                    continue
+                raw = raw[i:j + 1]
+
+            data = orjson.loads(raw)
+
+            # Accept temp/humi directly (don’t depend on msgs). Assign the
+            # attrs, not sensor_attr: count_attr is per-tick bookkeeping and
+            # must not tick at the Arduino's frame rate.
+            with alldata._lock:
+                if "temp" in data:
+                    alldata.temp = float(data["temp"])
+                    _serial_fresh["temp"] = True
+                if "humi" in data:
+                    alldata.humi = float(data["humi"])
+                    _serial_fresh["humi"] = True
+
+            print("th", end=" ")
+
+        except orjson.JSONDecodeError:
+            logging.warning(f"Arduino serial: bad JSON: {raw!r}")
+        except Exception as e:
+            logging.exception(f"serial producer failed: {e}")
+            time.sleep(1)
+
+threading.Thread(target=_serial_producer, daemon=True).start()
+
+
+try:
+    from sense_hat import SenseHat  # $
+    sense = SenseHat()
+except:
+    logging.error("Sensehat failed to init for an unknown reason. Check physical connections and file permissions.")
+
+def get_pressure():  # barometric data
+    try:
+        p = sense.get_pressure()
+        alldata.sensor_attr("pres", p)
+        time.sleep(0.1); print('pr', end=" ")
+    except:
+        logging.warning("Failed to read Sensehat Pressure Sensor for an unknown reason.")
+    
+def get_data_threaded():
+    # --- Optional sensors (disabled for current project scope) ---
+    # api_get_rainfall / api_get_windspeed / api_get_winddirection / api_get_UV
+    # would be submitted to SENSOR_POOL here as well (pool sized up accordingly).
+    # temp/humi come from the _serial_producer thread; the tick just reads them.
+    futs = [SENSOR_POOL.submit(get_pressure)]
+    print('tstart: ', end=" ")
+    # Count temp/humi once per tick, and only when a fresh frame arrived,
+    # so cattr stays comparable with rows recorded before the producer thread.
+    with alldata._lock:
+        for attr in ("temp", "humi"):
+            if _serial_fresh[attr]:
+                alldata.count_attr += 1
+                _serial_fresh[attr] = False
+    wait(futs)
+    print(':tend', end=" ")
+    
+
+
+"""
+while True:
+    alldata.start()
+    get_data_threaded()
+    alldata.end()
+    try:
+        time.sleep(FREQUENCY-time.time()+process_time)
+    except ValueError:
+        logging.error("Main Process exceeded time limit", FREQUENCY, time.time()-process_time)
+    process_time = time.time()
+"""
+
+# Anchor each tick at start + n*FREQUENCY on the monotonic clock: wall-clock
+# time jumps with NTP and plain sleep() accumulates drift, this never does.
+start = time.monotonic()
+tick = 0
+
+while not stop_event.is_set():
+    alldata.start()
+    get_data_threaded()
+    print(f"T={alldata.temp:.2f}C H={alldata.humi:.2f}% P={alldata.pres:.2f}HPa")
+    alldata.end()
+
+    tick += 1
+    sleep_s = start + tick * FREQUENCY - time.monotonic()
+
+    if sleep_s > 0:
+        # Wakes early when a signal sets stop_event.
+        stop_event.wait(sleep_s)
+    else:
+        logging.warning(
+        f"Main loop overran by {-sleep_s:.2f}s (FREQUENCY={FREQUENCY}s)")
+
+alldata._flush_db()
+alldata._csv_f.close()
+sys.exit(0)
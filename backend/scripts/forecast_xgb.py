@@ -4,7 +4,6 @@ from __future__ import annotations
 
 import argparse
 import json
-import math
 import sys
 from pathlib import Path
 from typing import Any, Dict, List
@@ -41,6 +40,7 @@ DEFAULT_FEATURE_COLUMNS = [
 STATION_TIMEZONE = "Asia/Singapore"
 HOURLY_OVERNIGHT_EXTENSION_START_HOUR = 18
 HOURLY_OVERNIGHT_EXTENSION_END_HOUR = 7
+NS_PER_HOUR = 3_600_000_000_000
 
 
 def _fail(message: str) -> None:
@@ -81,25 +81,33 @@ def _build_hourly_history(rows: List[Dict[str, Any]]) -> pd.DataFrame:
     if "time" not in df.columns:
         return pd.DataFrame(columns=["temp", "humi", "pres"])
 
-    df["time"] = pd.to_datetime(df["time"], utc=True, errors="coerce")
+    times = pd.to_datetime(df["time"], utc=True, errors="coerce")
     for col in ("temp", "humi", "pres"):
         if col not in df.columns:
             df[col] = np.nan
         df[col] = pd.to_numeric(df[col], errors="coerce")
 
-    df = df.dropna(subset=["time"])
-    if df.empty:
+    valid = times.notna()
+    if not valid.any():
         return pd.DataFrame(columns=["temp", "humi", "pres"])
 
-    df = df.sort_values("time").drop_duplicates(subset=["time"])
-    df = df.set_index("time")[["temp", "humi", "pres"]]
-
-    # Mirror the notebook preprocessing: hourly resample + light interpolation.
-    df_h = df.resample("1h").mean()
+    # Mirror the notebook preprocessing (hourly mean + light interpolation),
+    # but bucket on integer epoch hours with a single groupby instead of
+    # sort_values/drop_duplicates/set_index/resample — one pass, no Index
+    # rebuilds, and no need for pre-sorted input.
+    # as_unit("ns") first: pd.to_datetime may return microsecond resolution
+    # (pandas 3.x default for ISO strings), and epoch values in any other
+    # unit would collapse the whole history into one 1970 bucket.
+    hour_bucket = (times[valid].dt.as_unit("ns").astype("int64") // NS_PER_HOUR).to_numpy()
+    df_h = df.loc[valid, ["temp", "humi", "pres"]].groupby(hour_bucket).mean()
+    df_h = df_h.reindex(range(int(df_h.index.min()), int(df_h.index.max()) + 1))
+    df_h.index = pd.to_datetime(df_h.index * NS_PER_HOUR, utc=True).rename("time")
+
+    # Buckets are evenly spaced, so linear interpolation in both directions
+    # replaces the time-interpolate + ffill/bfill passes.
     df_h[["temp", "humi", "pres"]] = df_h[["temp", "humi", "pres"]].interpolate(
-        method="time", limit=3
+        method="linear", limit=3, limit_direction="both"
     )
-    df_h = df_h.ffill(limit=2)
 
     bounds = {"temp": (10.0, 45.0), "humi": (0.0, 100.0), "pres": (930.0, 1070.0)}
     for col, (lo, hi) in bounds.items():
@@ -112,46 +120,47 @@ def _build_hourly_history(rows: List[Dict[str, Any]]) -> pd.DataFrame:
         df_h.loc[jumps > threshold, col] = np.nan
 
     df_h[["temp", "humi", "pres"]] = df_h[["temp", "humi", "pres"]].interpolate(
-        method="time", limit=3
+        method="linear", limit=3, limit_direction="both"
     )
-    df_h = df_h.ffill(limit=2).bfill(limit=2)
     df_h = df_h.dropna(subset=["temp", "humi", "pres"])
     return df_h
 
 
-def _time_features(ts: pd.Timestamp) -> tuple[float, float, int]:
-    hour = ts.hour
-    hour_sin = math.sin(2 * math.pi * hour / 24.0)
-    hour_cos = math.cos(2 * math.pi * hour / 24.0)
-    dow = ts.dayofweek
+def _time_feature_arrays(idx: pd.DatetimeIndex) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    hours = idx.hour.to_numpy()
+    hour_sin = np.sin(2 * np.pi * hours / 24.0)
+    hour_cos = np.cos(2 * np.pi * hours / 24.0)
+    dow = idx.dayofweek.to_numpy()
     return hour_sin, hour_cos, dow
 
 
-def _feature_row(series_df: pd.DataFrame, ts: pd.Timestamp, feature_columns: List[str]) -> pd.DataFrame:
-    temp = series_df["temp"]
-    humi = series_df["humi"]
-    pres = series_df["pres"]
-
-    hour_sin, hour_cos, dow = _time_features(ts)
-
-    row: Dict[str, float] = {
-        "temp": float(temp.iloc[-1]),
-        "humi": float(humi.iloc[-1]),
-        "pres": float(pres.iloc[-1]),
-        "hour_sin": float(hour_sin),
-        "hour_cos": float(hour_cos),
+def _fill_feature_row(
+    arrays: Dict[str, np.ndarray],
+    end: int,
+    hour_sin: float,
+    hour_cos: float,
+    dow: float,
+    feature_columns: List[str],
+    out: np.ndarray,
+) -> None:
+    values: Dict[str, float] = {
+        "hour_sin": hour_sin,
+        "hour_cos": hour_cos,
         "dow": float(dow),
     }
 
-    for col, values in (("temp", temp), ("humi", humi), ("pres", pres)):
-        row[f"{col}_lag1"] = float(values.iloc[-1])
-        row[f"{col}_lag2"] = float(values.iloc[-2])
-        row[f"{col}_lag3"] = float(values.iloc[-3])
-        row[f"{col}_roll3_mean"] = float(values.iloc[-3:].mean())
-        row[f"{col}_roll6_mean"] = float(values.iloc[-6:].mean())
+    for col in ("temp", "humi", "pres"):
+        series = arrays[col]
+        values[col] = series[end - 1]
+        values[f"{col}_lag1"] = series[end - 1]
+        values[f"{col}_lag2"] = series[end - 2]
+        values[f"{col}_lag3"] = series[end - 3]
+        values[f"{col}_roll3_mean"] = series[end - 3 : end].mean()
+        values[f"{col}_roll6_mean"] = series[end - 6 : end].mean()
 
-    frame = pd.DataFrame([row], index=[ts])
-    return frame.reindex(columns=feature_columns)
+    row = out[0]
+    for position, name in enumerate(feature_columns):
+        row[position] = values[name]
 
 
 def _hourly_forecast_end(now_ts: pd.Timestamp) -> pd.Timestamp:
@@ -169,18 +178,21 @@ def _hourly_forecast_end(now_ts: pd.Timestamp) -> pd.Timestamp:
 
 
 def _future_index(mode: str, now_ts: pd.Timestamp, series_df: pd.DataFrame) -> pd.DatetimeIndex:
-    last_ts = series_df.index.max()
-    anchor = max(last_ts, now_ts.floor("h"))
+    # Work in int64 epoch nanoseconds: one np.arange builds the whole hourly
+    # range instead of date_range allocating a Timestamp per step.
+    floor_ns = int(now_ts.floor("h").value)
+    anchor_ns = max(int(series_df.index.max().value), floor_ns)
 
     if mode == "hourly":
-        end = _hourly_forecast_end(now_ts)
+        end_ns = int(_hourly_forecast_end(now_ts).value)
     else:
-        end = now_ts.floor("h") + pd.Timedelta(days=7)
+        end_ns = floor_ns + 7 * 24 * NS_PER_HOUR
 
-    if anchor >= end:
+    if anchor_ns >= end_ns:
         return pd.DatetimeIndex([], tz=now_ts.tz)
 
-    return pd.date_range(start=anchor + pd.Timedelta(hours=1), end=end, freq="1h")
+    hours = np.arange(anchor_ns + NS_PER_HOUR, end_ns + 1, NS_PER_HOUR, dtype="int64")
+    return pd.DatetimeIndex(hours.view("datetime64[ns]")).tz_localize("UTC").tz_convert(now_ts.tz)
 
 
 def _forecast(
@@ -191,56 +203,67 @@ def _forecast(
     feature_columns: List[str],
 ) -> List[Dict[str, float | str]]:
     if len(history_df) < 6:
-        _fail("Not enough history to run forecast (need at least 6 hourly points).")
+        raise ValueError("Not enough history to run forecast (need at least 6 hourly points).")
 
-    series_df = history_df[["temp", "humi", "pres"]].copy()
+    series_df = history_df[["temp", "humi", "pres"]]
     targets = ("temp", "humi", "pres")
 
     future_idx = _future_index(mode, now_ts, series_df)
     predictions: List[Dict[str, float | str]] = []
 
-    for ts in future_idx:
-        features = _feature_row(series_df, ts, feature_columns)
-
-        temp_pred = float(models["temp"].predict(features)[0])
-        humi_pred = float(models["humi"].predict(features)[0])
-        pres_pred = float(models["pres"].predict(features)[0])
-
-        temp_pred = float(np.clip(temp_pred, -20.0, 60.0))
-        humi_pred = float(np.clip(humi_pred, 0.0, 100.0))
-        pres_pred = float(np.clip(pres_pred, 900.0, 1100.0))
+    # Contiguous float32 arrays sized for history + horizon: indexing these is
+    # far cheaper than per-step pandas .iloc lookups inside the loop.
+    n_history = len(series_df)
+    n_total = n_history + len(future_idx)
+    arrays = {col: np.empty(n_total, dtype=np.float32) for col in targets}
+    for col in targets:
+        arrays[col][:n_history] = series_df[col].to_numpy(dtype=np.float32)
+
+    bounds = {"temp": (-20.0, 60.0), "humi": (0.0, 100.0), "pres": (900.0, 1100.0)}
+
+    # Precompute the calendar features for the whole horizon in one shot and
+    # predict through the Booster API: the sklearn wrapper's per-call
+    # DataFrame validation is pure overhead inside this loop.
+    hour_sin_arr, hour_cos_arr, dow_arr = _time_feature_arrays(future_idx)
+    boosters = {col: models[col].get_booster() for col in targets}
+
+    # One float32 feature row reused across the whole loop; inplace_predict
+    # reads it directly, skipping the per-step DMatrix allocation.
+    row = np.empty((1, len(feature_columns)), dtype=np.float32)
+
+    for step, ts in enumerate(future_idx):
+        end = n_history + step
+        _fill_feature_row(
+            arrays,
+            end,
+            float(hour_sin_arr[step]),
+            float(hour_cos_arr[step]),
+            float(dow_arr[step]),
+            feature_columns,
+            row,
+        )
 
-        series_df.loc[ts, list(targets)] = [temp_pred, humi_pred, pres_pred]
+        preds: Dict[str, float] = {}
+        for col in targets:
+            lo, hi = bounds[col]
+            pred = float(boosters[col].inplace_predict(row)[0])
+            pred = float(np.clip(pred, lo, hi))
+            preds[col] = pred
+            arrays[col][end] = pred
 
         predictions.append(
             {
                 "time": ts.isoformat(),
-                "temp": temp_pred,
-                "humi": humi_pred,
-                "pres": pres_pred,
+                "temp": preds["temp"],
+                "humi": preds["humi"],
+                "pres": preds["pres"],
             }
         )
 
     return predictions
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description="Run XGB weather forecast from stdin rows.")
-    parser.add_argument("--model", required=True, help="Path to xgb_3models_robust.joblib")
-    parser.add_argument("--mode", choices=["hourly", "weekly"], default="hourly")
-    args = parser.parse_args()
-
-    model_path = Path(args.model).expanduser().resolve()
-    if not model_path.exists():
-        _fail(f"Model file not found: {model_path}")
-
-    payload = _load_stdin_payload()
-    rows = payload.get("rows", [])
-    now_ts = _parse_now(payload.get("now"))
-
-    if not isinstance(rows, list):
-        _fail("Input field 'rows' must be an array.")
-
+def _load_models(model_path: Path) -> Dict[str, Any]:
     try:
         models = joblib.load(model_path)
     except Exception as exc:  # noqa: BLE001
@@ -253,16 +276,88 @@ def main() -> None:
         if key not in models:
             _fail(f"Model payload missing '{key}' regressor.")
 
-    history_df = _build_hourly_history(rows)
+    return models
+
 
-    feature_columns = DEFAULT_FEATURE_COLUMNS
-    temp_model = models.get("temp")
-    inferred_features = getattr(temp_model, "feature_names_in_", None)
+def _infer_feature_columns(models: Dict[str, Any]) -> List[str]:
+    inferred_features = getattr(models.get("temp"), "feature_names_in_", None)
     if inferred_features is not None:
-        feature_columns = [str(name) for name in inferred_features]
+        return [str(name) for name in inferred_features]
 
-    predictions = _forecast(models, history_df, args.mode, now_ts, feature_columns)
-    json.dump({"predictions": predictions}, sys.stdout)
+    return DEFAULT_FEATURE_COLUMNS
+
+
+def _handle_request(
+    models: Dict[str, Any],
+    feature_columns: List[str],
+    payload: Dict[str, Any],
+    default_mode: str,
+) -> Dict[str, Any]:
+    rows = payload.get("rows", [])
+    if not isinstance(rows, list):
+        raise ValueError("Input field 'rows' must be an array.")
+
+    mode = payload.get("mode", default_mode)
+    if mode not in ("hourly", "weekly"):
+        mode = default_mode
+
+    now_ts = _parse_now(payload.get("now"))
+    history_df = _build_hourly_history(rows)
+    predictions = _forecast(models, history_df, mode, now_ts, feature_columns)
+    return {"predictions": predictions}
+
+
+def _serve(models: Dict[str, Any], feature_columns: List[str], default_mode: str) -> None:
+    # Long-lived worker mode: the three regressors stay resident instead of
+    # paying joblib.load on every forecast. One JSON request per stdin line,
+    # one JSON response per stdout line.
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            payload = json.loads(line)
+            if not isinstance(payload, dict):
+                raise ValueError("Request must be a JSON object.")
+            response = _handle_request(models, feature_columns, payload, default_mode)
+        except ValueError as exc:
+            response = {"error": str(exc), "predictions": []}
+        except Exception as exc:  # noqa: BLE001
+            response = {"error": f"Forecast failed: {exc}", "predictions": []}
+
+        sys.stdout.write(json.dumps(response) + "\n")
+        sys.stdout.flush()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run XGB weather forecast from stdin rows.")
+    parser.add_argument("--model", required=True, help="Path to xgb_3models_robust.joblib")
+    parser.add_argument("--mode", choices=["hourly", "weekly"], default="hourly")
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Keep the model resident and answer line-delimited JSON requests on stdin.",
+    )
+    args = parser.parse_args()
+
+    model_path = Path(args.model).expanduser().resolve()
+    if not model_path.exists():
+        _fail(f"Model file not found: {model_path}")
+
+    models = _load_models(model_path)
+    feature_columns = _infer_feature_columns(models)
+
+    if args.serve:
+        _serve(models, feature_columns, args.mode)
+        return
+
+    payload = _load_stdin_payload()
+    try:
+        response = _handle_request(models, feature_columns, payload, args.mode)
+    except ValueError as exc:
+        _fail(str(exc))
+    json.dump(response, sys.stdout)
 
 
 if __name__ == "__main__":
@@ -5,10 +5,11 @@ from __future__ import annotations
 import json
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional, Tuple
-from urllib.error import HTTPError, URLError
-from urllib.request import Request, urlopen
+
+import requests
 
 
 API_BASE = "https://api-open.data.gov.sg/v2/real-time/api"
@@ -25,6 +26,14 @@ DEFAULT_HEADERS = {
     "Pragma": "no-cache",
 }
 
+# Shared keep-alive session: the three endpoint calls reuse one TCP+TLS
+# connection instead of paying a fresh handshake each.
+SESSION = requests.Session()
+SESSION.mount(
+    "https://",
+    requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=1),
+)
+
 
 def _fail(message: str) -> None:
     print(message, file=sys.stderr)
@@ -72,9 +81,12 @@ def _to_iso_timestamp(raw: Any) -> Optional[str]:
     return parsed.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
 
 
-def _error_body_snippet(exc: HTTPError) -> str:
+def _error_body_snippet(response: Optional[requests.Response]) -> str:
+    if response is None:
+        return ""
+
     try:
-        raw = exc.read().decode("utf-8", errors="ignore").strip()
+        raw = response.text.strip()
     except Exception:
         return ""
 
@@ -92,12 +104,11 @@ def _headers_for(api_key: Optional[str]) -> Dict[str, str]:
 
 
 def _attempt_fetch(path: str, headers: Dict[str, str], timeout: float) -> Dict[str, Any]:
-    request = Request(f"{API_BASE}/{path}", headers=headers)
-    with urlopen(request, timeout=timeout) as response:
-        raw_payload = response.read().decode("utf-8")
+    response = SESSION.get(f"{API_BASE}/{path}", headers=headers, timeout=timeout)
+    response.raise_for_status()
 
     try:
-        payload = json.loads(raw_payload)
+        payload = json.loads(response.text)
     except json.JSONDecodeError as exc:
         _fail(f"{path} API returned invalid JSON: {exc}")
 
@@ -124,16 +135,17 @@ def _fetch_endpoint(path: str, api_key: str, timeout: float) -> Dict[str, Any]:
         headers = _headers_for(maybe_key)
         try:
             return _attempt_fetch(path, headers, timeout)
-        except HTTPError as exc:
-            snippet = _error_body_snippet(exc)
-            detail = f"{mode_label}: status {exc.code}"
+        except requests.HTTPError as exc:
+            snippet = _error_body_snippet(exc.response)
+            status = exc.response.status_code if exc.response is not None else "unknown"
+            detail = f"{mode_label}: status {status}"
             if snippet:
                 detail += f" ({snippet})"
             errors.append(detail)
-        except URLError as exc:
-            errors.append(f"{mode_label}: {exc.reason}")
-        except TimeoutError:
+        except requests.Timeout:
             errors.append(f"{mode_label}: timed out")
+        except requests.RequestException as exc:
+            errors.append(f"{mode_label}: {exc}")
 
     _fail(f"{path} API request failed. {'; '.join(errors)}")
 
@@ -202,9 +214,16 @@ def main() -> None:
     timeout = _parse_timeout_seconds()
     api_key = os.getenv("DATAGOV_API_KEY", "").strip()
 
-    rainfall_payload = _fetch_endpoint("rainfall", api_key, timeout)
-    windspeed_payload = _fetch_endpoint("wind-speed", api_key, timeout)
-    winddirection_payload = _fetch_endpoint("wind-direction", api_key, timeout)
+    # The three endpoints are independent I/O; fetching them concurrently
+    # makes the wall time the max of the three latencies instead of the sum.
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        rainfall_future = executor.submit(_fetch_endpoint, "rainfall", api_key, timeout)
+        windspeed_future = executor.submit(_fetch_endpoint, "wind-speed", api_key, timeout)
+        winddirection_future = executor.submit(_fetch_endpoint, "wind-direction", api_key, timeout)
+
+        rainfall_payload = rainfall_future.result()
+        windspeed_payload = windspeed_future.result()
+        winddirection_payload = winddirection_future.result()
 
     rainfall_series = _extract_series(rainfall_payload, station_id)
     windspeed_series = _extract_series(windspeed_payload, station_id)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""Regression checks for forecast_xgb preprocessing (run with python -m unittest)."""
+
+from __future__ import annotations
+
+import unittest
+
+import pandas as pd
+
+import forecast_xgb
+
+
+class BuildHourlyHistoryTest(unittest.TestCase):
+    def test_string_timestamp_rows_keep_hourly_buckets(self) -> None:
+        # Regression: pd.to_datetime on ISO strings can return microsecond
+        # resolution, which once collapsed the whole history into a single
+        # 1970 bucket and broke every forecast.
+        index = pd.date_range("2026-08-01", periods=48, freq="1h", tz="UTC")
+        rows = [
+            {"time": ts.isoformat(), "temp": 25.0 + i % 3, "humi": 70.0, "pres": 1008.0}
+            for i, ts in enumerate(index)
+        ]
+
+        history = forecast_xgb._build_hourly_history(rows)
+
+        self.assertEqual(len(history), 48)
+        self.assertEqual(history.index.min(), index[0])
+        self.assertEqual(history.index.max(), index[-1])
+
+    def test_sub_hourly_rows_average_into_their_hour(self) -> None:
+        rows = [
+            {"time": "2026-08-01T10:00:00Z", "temp": 24.0, "humi": 70.0, "pres": 1008.0},
+            {"time": "2026-08-01T10:30:00Z", "temp": 26.0, "humi": 72.0, "pres": 1010.0},
+            {"time": "2026-08-01T11:00:00Z", "temp": 25.0, "humi": 71.0, "pres": 1009.0},
+        ]
+
+        history = forecast_xgb._build_hourly_history(rows)
+
+        self.assertEqual(len(history), 2)
+        self.assertAlmostEqual(history["temp"].iloc[0], 25.0)
+        self.assertAlmostEqual(history["humi"].iloc[0], 71.0)
+        self.assertAlmostEqual(history["pres"].iloc[0], 1009.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,4 @@
-import { spawn } from 'node:child_process'
+import { spawn, type ChildProcessWithoutNullStreams } from 'node:child_process'
 import { dirname, resolve } from 'node:path'
 import { fileURLToPath } from 'node:url'
 import { Router } from 'express'
@@ -334,6 +334,111 @@ const rowsToForecastInput = (rows: SensorRow[]) => {
   return points
 }
 
+// Persistent forecast worker: the Python script is spawned once with --serve
+// and kept alive so the joblib model load is paid on the first request only.
+// Requests go in as one JSON line on stdin; responses come back as one JSON
+// line on stdout, in request order.
+type ForecastPending = {
+  settle: (line: string) => void
+  fail: (error: Error) => void
+}
+
+type ForecastWorker = {
+  child: ChildProcessWithoutNullStreams
+  // Requests in flight on this specific child; a stale child's exit can
+  // therefore never reject requests queued for its replacement.
+  pending: ForecastPending[]
+}
+
+let forecastWorker: ForecastWorker | null = null
+let forecastWorkerKey = ''
+
+const retireForecastWorker = (worker: ForecastWorker) => {
+  if (forecastWorker === worker) {
+    forecastWorker = null
+  }
+  worker.child.kill('SIGTERM')
+}
+
+const ensureForecastWorker = ({
+  modelPath,
+  scriptPath,
+  pythonBin,
+}: {
+  modelPath: string
+  scriptPath: string
+  pythonBin: string
+}) => {
+  const key = [pythonBin, scriptPath, modelPath].join('|')
+  if (forecastWorker && forecastWorkerKey === key) {
+    return forecastWorker
+  }
+
+  if (forecastWorker) {
+    retireForecastWorker(forecastWorker)
+  }
+
+  const child = spawn(pythonBin, [scriptPath, '--model', modelPath, '--serve'], {
+    stdio: ['pipe', 'pipe', 'pipe'],
+  })
+
+  const worker: ForecastWorker = { child, pending: [] }
+  let stdoutBuffer = ''
+  let stderrTail = ''
+
+  const rejectPending = (error: Error) => {
+    while (worker.pending.length > 0) {
+      worker.pending.shift()?.fail(error)
+    }
+  }
+
+  child.stdout.on('data', (chunk: Buffer) => {
+    stdoutBuffer += chunk.toString()
+
+    let newlineIndex = stdoutBuffer.indexOf('\n')
+    while (newlineIndex !== -1) {
+      const line = stdoutBuffer.slice(0, newlineIndex).trim()
+      stdoutBuffer = stdoutBuffer.slice(newlineIndex + 1)
+      if (line) {
+        worker.pending.shift()?.settle(line)
+      }
+      newlineIndex = stdoutBuffer.indexOf('\n')
+    }
+  })
+
+  child.stderr.on('data', (chunk: Buffer) => {
+    stderrTail = (stderrTail + chunk.toString()).slice(-2000)
+  })
+
+  // A write can race a dying child (EPIPE); without a handler that is an
+  // unhandled stream error that takes down the whole server.
+  child.stdin.on('error', (error) => {
+    if (forecastWorker === worker) {
+      forecastWorker = null
+    }
+    rejectPending(error)
+  })
+
+  child.on('error', (error) => {
+    if (forecastWorker === worker) {
+      forecastWorker = null
+    }
+    rejectPending(error)
+  })
+
+  child.on('close', (code) => {
+    if (forecastWorker === worker) {
+      forecastWorker = null
+    }
+    const message = stderrTail.trim() || `Forecast worker exited with ${code}.`
+    rejectPending(new Error(message))
+  })
+
+  forecastWorker = worker
+  forecastWorkerKey = key
+  return worker
+}
+
 const runForecastScript = async ({
   mode,
   rows,
@@ -350,14 +455,8 @@ const runForecastScript = async ({
   nowIso: string
 }) =>
   new Promise<ForecastOutputRow[]>((resolvePromise, rejectPromise) => {
-    const child = spawn(
-      pythonBin,
-      [scriptPath, '--model', modelPath, '--mode', mode],
-      { stdio: ['pipe', 'pipe', 'pipe'] },
-    )
+    const worker = ensureForecastWorker({ modelPath, scriptPath, pythonBin })
 
-    let stdout = ''
-    let stderr = ''
     let settled = false
 
     const settleReject = (error: Error) => {
@@ -365,6 +464,7 @@ const runForecastScript = async ({
         return
       }
       settled = true
+      clearTimeout(timeoutId)
       rejectPromise(error)
     }
 
@@ -373,65 +473,52 @@ const runForecastScript = async ({
         return
       }
       settled = true
+      clearTimeout(timeoutId)
       resolvePromise(result)
     }
 
     const timeoutId = setTimeout(() => {
-      child.kill('SIGTERM')
+      // Retire the stuck worker immediately so no caller writes to the dying
+      // child before its close event fires; the next request spawns a fresh one.
+      retireForecastWorker(worker)
       settleReject(new Error('Forecast process timed out.'))
     }, FORECAST_TIMEOUT_MS)
 
-    child.stdout.on('data', (chunk: Buffer) => {
-      stdout += chunk.toString()
-    })
-
-    child.stderr.on('data', (chunk: Buffer) => {
-      stderr += chunk.toString()
-    })
-
-    child.on('error', (error) => {
-      clearTimeout(timeoutId)
-      settleReject(error)
-    })
-
-    child.on('close', (code) => {
-      clearTimeout(timeoutId)
-
-      if (code !== 0) {
-        const message = stderr.trim() || stdout.trim() || `Forecast process exited with ${code}.`
-        settleReject(new Error(message))
-        return
-      }
-
-      try {
-        const parsed = JSON.parse(stdout) as ForecastScriptOutput
-        if (!parsed || !Array.isArray(parsed.predictions)) {
-          throw new Error('Invalid forecast payload.')
-        }
+    worker.pending.push({
+      fail: settleReject,
+      settle: (line: string) => {
+        try {
+          const parsed = JSON.parse(line) as ForecastScriptOutput & { error?: string }
+          if (parsed?.error) {
+            throw new Error(parsed.error)
+          }
+          if (!parsed || !Array.isArray(parsed.predictions)) {
+            throw new Error('Invalid forecast payload.')
+          }
 
-        const points: ForecastOutputRow[] = []
-        for (const row of parsed.predictions) {
-          const time = toIsoTime(row.time)
-          const temp = parseNumber(row.temp)
-          const humi = parseNumber(row.humi)
-          const pres = parseNumber(row.pres)
-          if (!time || temp === null || humi === null || pres === null) {
-            continue
+          const points: ForecastOutputRow[] = []
+          for (const row of parsed.predictions) {
+            const time = toIsoTime(row.time)
+            const temp = parseNumber(row.temp)
+            const humi = parseNumber(row.humi)
+            const pres = parseNumber(row.pres)
+            if (!time || temp === null || humi === null || pres === null) {
+              continue
+            }
+
+            points.push({ time, temp, humi, pres })
           }
 
-          points.push({ time, temp, humi, pres })
+          settleResolve(points)
+        } catch (error) {
+          const message =
+            error instanceof Error ? error.message : 'Failed to parse forecast payload.'
+          settleReject(new Error(message))
         }
-
-        settleResolve(points)
-      } catch (error) {
-        const message =
-          error instanceof Error ? error.message : 'Failed to parse forecast payload.'
-        settleReject(new Error(message))
-      }
+      },
     })
 
-    child.stdin.write(JSON.stringify({ now: nowIso, rows }))
-    child.stdin.end()
+    worker.child.stdin.write(`${JSON.stringify({ now: nowIso, rows, mode })}\n`)
   })
 
 router.get('/metrics', async (req, res) => {